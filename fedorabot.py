@@ -5,17 +5,175 @@ An intelligent chatbot for building different Fedora CoreOS streams using COSA c
 Supports automatic branch switching and stream-specific builds.
 """
 
+import asyncio
+import atexit
+import bisect
 import os
 import sys
 import subprocess
 import shlex
+import shutil
+import signal
 import time
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None  # fall back to the git CLI for local metadata reads
+
+try:
+    import readline
+except ImportError:
+    readline = None  # no line editing or tab-completion at the prompt
+
+
+def _trie_regex(words) -> str:
+    """Build a regex alternation of words, factored into a prefix trie"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}  # end-of-word marker
+
+    def render(node):
+        alternatives = [re.escape(char) + render(child)
+                        for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        optional = '' in node
+        if len(alternatives) == 1 and not optional:
+            return alternatives[0]
+        group = '(?:' + '|'.join(alternatives) + ')'
+        return group + '?' if optional else group
+
+    return render(trie)
+
+
+# Words in a 'run' argument that mean a kola test rather than VM options
+_TEST_INDICATORS = frozenset({"basic", "podman", "network", "internet", "coreos", "ostree", "rpmostree", "systemd"})
+_TEST_INDICATOR_RE = re.compile(_trie_regex(_TEST_INDICATORS), re.IGNORECASE)
+_TEST_KEYWORD_RE = re.compile(_trie_regex(("test", "kola")), re.IGNORECASE)
+# Trailing words that turn 'run <pattern> ...' into a kola test run
+_TEST_SUFFIXES = frozenset({"test", "tests"})
+
+# User-facing command aliases -> canonical command names
+_COMMAND_ALIASES = {
+    "checkout": "switch",
+    "streams": "list_streams",
+    "branches": "list_streams",
+    "list": "list_streams",
+    "update": "refresh",
+    "fetch-branches": "refresh",
+    "current": "current_stream",
+    "clean-directory": "clean-dir",
+    "test": "kola_run",  # Shorthand for kola run
+    "test-summary": "test_summary",
+}
+
+# Commands whose meaning changes when used without arguments
+_BARE_COMMANDS = {
+    "kola": "kola_help",
+    "run": "run_vm",  # "run" alone -> start VM
+}
+
+# 'kola <subcommand>' -> canonical command names ('kola run' takes a pattern)
+_KOLA_SUBCOMMANDS = {
+    "list": "kola_list",
+    "interactive": "kola_interactive",
+}
+
+_HELP_TEXT = """
+🤖 Fedora CoreOS Bot Commands:
+
+Quick Build Commands:
+  build <stream>     - Automatically build a specific stream (e.g., 'build rawhide')
+  build stable       - Build the stable release
+  build testing      - Build the testing release  
+  build testing-devel- Build the testing development version
+  build next         - Build the next release
+  build rawhide      - Build the latest development version
+  
+Testing Commands:
+  kola list          - List all available kola tests
+  kola run [pattern] - Run kola tests (all tests or matching pattern)
+  kola interactive   - Interactive test selection and execution
+  test [pattern]     - Shorthand for kola run
+  run [test] test    - Natural language test runner (e.g., "run basic test")
+  run [test]         - Run specific test (e.g., "run basic", "run podman")
+  test-summary       - Show testing status for all streams
+  
+Manual Build Commands:
+  init [repo]        - Initialize COSA (default: fedora-coreos-config)
+  force-init [repo]  - Force initialize COSA (override non-empty directory)
+  fetch [stream]     - Fetch packages for current or specified stream
+  build [stream]     - Build image for current or specified stream
+  run [args]         - Run the built CoreOS VM
+  
+Stream Management:
+  streams            - List available streams/branches
+  refresh            - Fetch all remote branches and update stream list
+  switch <stream>    - Switch to a different stream
+  current            - Show current stream
+  
+Utility Commands:
+  status             - Show detailed build status and disk space
+  pull               - Pull latest COSA container
+  shell              - Open shell in COSA container
+  disk               - Check disk space usage
+  clean              - Clean old builds to free space
+  clean-all          - Clean builds and unused containers
+  clean-dir          - Clean entire working directory
+  help               - Show this help message
+  quit/exit          - Exit the bot
+
+🚀 Quick Start Examples:
+  "build rawhide"      - Build the latest Fedora CoreOS development version
+  "build stable"       - Build the stable release
+  "build testing-devel"- Build the testing development version
+  "kola list"          - See all available tests after building
+  "run basic test"     - Run basic kola tests (natural language)
+  "run basic"          - Run basic tests (shorthand)
+  "run podman test"    - Run podman-related tests
+  "kola interactive"   - Interactively select and run tests
+  "run"                - Start the CoreOS VM (no args = VM, with test name = kola)
+  "switch next"        - Switch to next stream, then "fetch" and "build"
+
+💡 Tips:
+  - Different streams correspond to different git branches
+  - The bot tracks build state per stream automatically  
+  - CoreOS builds require 10-20 GB of free disk space
+  - After building, use natural language: 'run basic test', 'run podman test'
+  - Use 'run' alone to start VM, 'run [test]' to run kola tests
+  - Use 'kola list' to see all available tests
+  - Use 'disk' to check space and 'clean' to free up space
+  - If init fails with "directory not empty", use 'force-init' or 'clean-dir'
+  - If streams are missing, use 'refresh' to fetch all remote branches
+  - Use 'status' to see what's been built for each stream
+  - All data persists in the working directory
+"""
+
 class FedoraCOSABot:
+    __slots__ = (
+        'work_dir', 'container_image', 'config_repo', 'initialized',
+        '_current_stream', '_prompt', 'available_streams', 'non_interactive', 'build_states',
+        'config_dir', 'config_git_dir', 'cache_dir', 'builds_dir',
+        '_podman_base', '_podman_base_ti', '_daemon_name', '_daemon_failed',
+        '_branches_cache', '_branches_cache_ts', '_local_branches_cache',
+        '_cache_version',
+    )
+    
+    BRANCHES_CACHE_TTL = 60  # seconds
+    FETCH_HEAD_TTL = 60  # seconds
+    HISTORY_FILE = os.path.expanduser("~/.fcos_bot_history")
+    HISTORY_LENGTH = 1000
+    DAEMON_LABEL = "fedorabot.daemon"  # value is the owning bot's PID
+
     def __init__(self, work_dir: str = "./fcos"):
         self.work_dir = Path(work_dir).resolve()
         self.container_image = "quay.io/coreos-assembler/coreos-assembler:latest"
@@ -24,44 +182,80 @@ class FedoraCOSABot:
         self.current_stream = None
         self.available_streams = ["testing-devel", "stable", "testing", "next", "rawhide"]
         
+        # Never block on confirmation prompts (e.g. for CI); they answer 'no'
+        self.non_interactive = os.environ.get('FEDORABOT_NONINTERACTIVE') == '1'
+        
+        # Well-known paths inside the working directory
+        self.config_dir = self.work_dir / "src" / "config"
+        self.config_git_dir = self.config_dir / ".git"
+        self.cache_dir = self.work_dir / "cache"
+        self.builds_dir = self.work_dir / "builds"
+        
+        # Podman options for the COSA container, built once; '-ti' variant
+        # is used for interactive commands. The container name and image are
+        # appended per call so that several cosa containers can run at once.
+        self._podman_base = (
+            'podman', 'run', '--rm',
+            '--security-opt=label=disable',
+            '--privileged',
+            '--userns=keep-id:uid=1000,gid=1000',
+            f'-v={self.work_dir}:/srv/',
+            '--device=/dev/kvm',
+            '--device=/dev/fuse',
+            '--tmpfs=/tmp',
+            '-v=/var/tmp:/var/tmp',
+        )
+        self._podman_base_ti = self._podman_base[:2] + ('-ti',) + self._podman_base[2:]
+        self._daemon_name = None  # set while a long-lived COSA container is running
+        self._daemon_failed = False  # don't retry a failed start until the next pull
+        
         # Build state tracking
         self.build_states = {}  # stream -> {fetched: bool, built: bool}
         
+        # Remote branch list cache, refreshed at most every BRANCHES_CACHE_TTL seconds
+        self._branches_cache = None
+        self._branches_cache_ts = 0
+        
+        # Branches read from local refs, keyed by (_cache_version, FETCH_HEAD
+        # mtime); commands that change the config repo bump _cache_version
+        self._local_branches_cache = None
+        self._cache_version = 0
+        
         # Create working directory if it doesn't exist
         self.work_dir.mkdir(exist_ok=True)
-        os.chdir(self.work_dir)
         
         print(f"🤖 Fedora CoreOS Bot initialized in: {self.work_dir}")
         print(f"📡 Config repository: {self.config_repo}")
         
+    @property
+    def current_stream(self) -> Optional[str]:
+        return self._current_stream
+    
+    @current_stream.setter
+    def current_stream(self, value: Optional[str]):
+        self._current_stream = value
+        # The REPL prompt only changes with the stream, so build it here
+        self._prompt = f"\n🤖 fcos-bot ({value or 'none'})> "
+    
     def check_prerequisites(self) -> bool:
         """Check if required tools are available"""
-        try:
-            # Check for podman
-            result = subprocess.run(['podman', '--version'], 
-                                  capture_output=True, text=True)
-            if result.returncode != 0:
-                print("❌ Podman not found. Please install podman first.")
-                return False
-                
-            # Check for git
-            result = subprocess.run(['git', '--version'], 
-                                  capture_output=True, text=True)
-            if result.returncode != 0:
-                print("❌ Git not found. Please install git first.")
-                return False
-                
-            # Check for /dev/kvm
-            if not os.path.exists('/dev/kvm'):
-                print("⚠️  /dev/kvm not found. Virtualization may not work properly.")
-                print("   Make sure you have KVM enabled or are running on bare metal.")
-                
-            print("✅ Prerequisites check passed!")
-            return True
-            
-        except FileNotFoundError:
-            print("❌ Required tools not found. Please install podman and git.")
+        # A PATH lookup is enough to tell whether the tools are installed,
+        # so avoid spawning '--version' subprocesses for each of them
+        if not shutil.which('podman'):
+            print("❌ Podman not found. Please install podman first.")
+            return False
+
+        if not shutil.which('git'):
+            print("❌ Git not found. Please install git first.")
             return False
+
+        # Check for /dev/kvm
+        if not os.path.exists('/dev/kvm'):
+            print("⚠️  /dev/kvm not found. Virtualization may not work properly.")
+            print("   Make sure you have KVM enabled or are running on bare metal.")
+
+        print("✅ Prerequisites check passed!")
+        return True
     
     def pull_container(self) -> bool:
         """Pull the COSA container image"""
@@ -72,6 +266,12 @@ class FedoraCOSABot:
                 'podman', 'pull', self.container_image
             ], check=True)
             
+            # The persistent container still runs the old image; the next
+            # cosa command starts a fresh one from the pulled image (which
+            # may also fix an earlier failure to start it)
+            self.stop_cosa_daemon()
+            self._daemon_failed = False
+            
             print("✅ Container pulled successfully!")
             return True
             
@@ -79,44 +279,127 @@ class FedoraCOSABot:
             print(f"❌ Failed to pull container: {e}")
             return False
     
+    async def _astream(self, argv: List[str]) -> int:
+        """Run a command, copying its combined output to stdout as it arrives"""
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        
+        sys.stdout.flush()
+        # Text-only streams (e.g. when embedded or under a test harness)
+        # have no binary buffer to copy into
+        buffer = getattr(sys.stdout, 'buffer', None)
+        while True:
+            chunk = await proc.stdout.read(65536)
+            if not chunk:
+                break
+            if buffer is not None:
+                buffer.write(chunk)
+                buffer.flush()
+            else:
+                sys.stdout.write(chunk.decode(errors='replace'))
+                sys.stdout.flush()
+            
+        return await proc.wait()
+    
+    def start_cosa_daemon(self) -> bool:
+        """Start a long-lived COSA container that commands are exec'd into"""
+        if self._daemon_name:
+            return True
+        if self._daemon_failed:
+            return False
+            
+        self._remove_stale_daemons()
+        
+        # Never pull here: a detached run would download the image with its
+        # progress hidden. Without a local image, commands fall back to
+        # 'podman run', which pulls visibly.
+        name = f'cosa-daemon-{os.getpid()}'
+        result = subprocess.run([
+            *self._podman_base, '-d', '--pull=never', f'--name={name}',
+            f'--label={self.DAEMON_LABEL}={os.getpid()}',
+            # Keep an init as PID 1 to reap processes orphaned by exec'd
+            # commands (qemu, supermin), since sleep replaces dumb-init
+            '--init', '--entrypoint=/usr/bin/sleep', self.container_image, 'infinity'
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        
+        if result.returncode != 0:
+            self._daemon_failed = True
+            print(f"ℹ️  Persistent COSA container not available, using one container per command: {result.stderr.strip()}")
+            return False
+            
+        self._daemon_name = name
+        atexit.register(self.stop_cosa_daemon)
+        return True
+    
+    def _remove_stale_daemons(self):
+        """Remove persistent COSA containers left behind by bots that have exited"""
+        # A bot killed without running its atexit handlers (e.g. SIGKILL)
+        # leaves its container running; other live bots keep theirs
+        result = subprocess.run([
+            'podman', 'ps', '-a', f'--filter=label={self.DAEMON_LABEL}',
+            f'--format={{{{.Names}}}} {{{{index .Labels "{self.DAEMON_LABEL}"}}}}'
+        ], capture_output=True, text=True)
+        if result.returncode != 0:
+            return
+            
+        stale = []
+        for line in result.stdout.splitlines():
+            name, _, pid = line.partition(' ')
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                stale.append(name)
+            except (ValueError, OSError):
+                pass  # alive (owned by someone else) or unreadable label
+                
+        if stale:
+            subprocess.run(['podman', 'rm', '-f', '--time=0', *stale],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    
+    def stop_cosa_daemon(self):
+        """Stop and remove the long-lived COSA container, if running"""
+        if not self._daemon_name:
+            return
+            
+        subprocess.run(['podman', 'rm', '-f', '--time=0', self._daemon_name],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._daemon_name = None
+    
     def run_cosa_command(self, command: str, interactive: bool = True) -> bool:
         """Execute a COSA command in the container"""
         
-        # Build the podman command based on the document
-        podman_cmd = [
-            'podman', 'run', '--rm',
-            '--security-opt=label=disable',
-            '--privileged',
-            '--userns=keep-id:uid=1000,gid=1000',
-            f'-v={self.work_dir}:/srv/',
-            '--device=/dev/kvm',
-            '--device=/dev/fuse',
-            '--tmpfs=/tmp',
-            '-v=/var/tmp:/var/tmp',
-            '--name=cosa',
-            self.container_image
-        ]
-        
-        if interactive:
-            podman_cmd.insert(2, '-ti')
+        cosa_args = shlex.split(command)
         
-        podman_cmd.extend(shlex.split(command))
+        # Reuse the long-lived container, starting it on first use; 'run'
+        # (QEMU) keeps a dedicated container so it gets its own TTY and lifetime
+        if cosa_args[:1] != ['run'] and self.start_cosa_daemon():
+            podman_cmd = ['podman', 'exec']
+            if interactive:
+                podman_cmd.append('-ti')
+            podman_cmd += ['-w', '/srv', self._daemon_name, 'cosa', *cosa_args]
+        else:
+            base = self._podman_base_ti if interactive else self._podman_base
+            podman_cmd = [
+                *base,
+                f'--name=cosa-{os.getpid()}-{int(time.time() * 1000)}',
+                self.container_image,
+                *cosa_args
+            ]
         
         print(f"🚀 Running: cosa {command}")
         
         try:
             if interactive:
-                result = subprocess.run(podman_cmd)
+                returncode = subprocess.run(podman_cmd).returncode
             else:
-                result = subprocess.run(podman_cmd, capture_output=True, text=True)
+                # Show output as it is produced instead of buffering all of it
+                returncode = asyncio.run(self._astream(podman_cmd))
             
-            if result.returncode == 0:
+            if returncode == 0:
                 print(f"✅ Command completed successfully!")
                 return True
             else:
-                print(f"❌ Command failed with exit code: {result.returncode}")
-                if not interactive and result.stderr:
-                    print(f"Error: {result.stderr}")
+                print(f"❌ Command failed with exit code: {returncode}")
                 return False
                 
         except subprocess.CalledProcessError as e:
@@ -124,32 +407,93 @@ class FedoraCOSABot:
             return False
         except KeyboardInterrupt:
             print("\n⚠️  Command interrupted by user")
+            # 'podman exec' does not forward the interrupt, so the command
+            # would keep running in the persistent container
+            if podman_cmd[1] == 'exec':
+                self.stop_cosa_daemon()
             return False
     
-    def get_available_branches(self) -> List[str]:
+    def _remote_branches(self) -> Optional[List[str]]:
+        """List origin's branches from the local config repo, or None on error"""
+        # Read refs in-process when pygit2 is available, otherwise ask git
+        if pygit2 is not None:
+            try:
+                repo = pygit2.Repository(str(self.config_dir))
+                return [name[len('origin/'):] for name in repo.branches.remote
+                        if name.startswith('origin/') and name != 'origin/HEAD']
+            except pygit2.GitError:
+                return None
+                
+        # Parse lines as git writes them rather than buffering the whole output
+        branches = []
+        with subprocess.Popen([
+            'git', '-C', str(self.config_dir), 'branch', '-r'
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True) as proc:
+            for line in proc.stdout:
+                name = line.strip()
+                if name.startswith('origin/') and '->' not in name:
+                    branch = name[len('origin/'):]
+                    if branch and branch != 'HEAD':
+                        branches.append(branch)
+                        
+        if proc.returncode != 0:
+            return None
+        return branches
+    
+    def _current_branch(self) -> Optional[str]:
+        """Return the branch checked out in the config repo, if any"""
+        try:
+            if pygit2 is not None:
+                repo = pygit2.Repository(str(self.config_dir))
+                if repo.head_is_detached or repo.head_is_unborn:
+                    return None
+                return repo.head.shorthand
+                
+            result = subprocess.run([
+                'git', '-C', str(self.config_dir), 'branch', '--show-current'
+            ], capture_output=True, text=True)
+            if result.returncode == 0:
+                return result.stdout.strip() or None
+                
+        except Exception:
+            pass
+        return None
+    
+    def get_available_branches(self, allow_network: bool = True) -> List[str]:
         """Get available branches from the config repository"""
-        config_dir = self.work_dir / "src" / "config"
-        if not config_dir.exists():
+        if not self.config_dir.exists():
             return self.available_streams
             
+        # Serve recent results from the cache to avoid a network fetch
+        if (self._branches_cache is not None and
+                time.time() - self._branches_cache_ts < self.BRANCHES_CACHE_TTL):
+            return self._branches_cache
+            
+        # Without network access, the remote-tracking refs from the last
+        # fetch are as fresh as anything we could have cached
+        if not allow_network:
+            key = (self._cache_version, self._fetch_head_mtime())
+            if self._local_branches_cache and self._local_branches_cache[0] == key:
+                return self._local_branches_cache[1]
+                
+            branches = self._remote_branches()
+            if branches is None:
+                return self.available_streams
+            self._local_branches_cache = (key, branches)
+            return branches
+            
         try:
             # First, fetch from remote to get all branches
-            subprocess.run([
-                'git', '-C', str(config_dir), 'fetch', 'origin'
-            ], capture_output=True, text=True)
-            
-            # Get remote branches
             result = subprocess.run([
-                'git', '-C', str(config_dir), 'branch', '-r'
-            ], capture_output=True, text=True)
+                'git', '-C', str(self.config_dir), 'fetch', '--filter=blob:none', 'origin'
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if result.returncode != 0:
+                print(f"⚠️  Could not fetch branches, using local refs: {result.stderr.strip()}")
             
-            if result.returncode == 0:
-                branches = []
-                for line in result.stdout.split('\n'):
-                    if 'origin/' in line and '->' not in line:
-                        branch = line.strip().replace('origin/', '')
-                        if branch and branch != 'HEAD':
-                            branches.append(branch)
+            branches = self._remote_branches()
+            if branches is not None:
+                self._branches_cache = branches
+                self._branches_cache_ts = time.time()
                 return branches
             
         except Exception as e:
@@ -157,70 +501,107 @@ class FedoraCOSABot:
             
         return self.available_streams
     
+    def _invalidate_caches(self):
+        """Forget cached repository state after a command that changes it"""
+        self._cache_version += 1
+        self._branches_cache = None
+        self._local_branches_cache = None
+    
+    def _fetch_head_mtime(self) -> Optional[float]:
+        """Return when the config repo was last fetched, if it ever was"""
+        try:
+            return (self.config_git_dir / "FETCH_HEAD").stat().st_mtime
+        except OSError:
+            return None
+    
+    def _fetched_recently(self, stream: str) -> bool:
+        """Check whether the last fetch, made within FETCH_HEAD_TTL, covered stream"""
+        fetch_head_mtime = self._fetch_head_mtime()
+        if fetch_head_mtime is None or time.time() - fetch_head_mtime >= self.FETCH_HEAD_TTL:
+            return False
+            
+        # Fetches may cover a single branch, so FETCH_HEAD must list this one
+        try:
+            with open(self.config_git_dir / "FETCH_HEAD") as f:
+                return any(f"branch '{stream}' of" in line for line in f)
+        except OSError:
+            return False
+    
+    def _fetch_stream(self, stream: str) -> bool:
+        """Fetch a single stream branch from the config repository remote"""
+        # Fetch only the requested branch rather than every ref and tag, and
+        # leave blobs to be fetched lazily on checkout (partial clone)
+        print(f"📡 Fetching latest '{stream}' from remote...")
+        result = subprocess.run([
+            'git', '-C', str(self.config_dir), 'fetch', '--no-tags', '--filter=blob:none', 'origin',
+            f'+refs/heads/{stream}:refs/remotes/origin/{stream}'
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            print(f"⚠️  Could not fetch '{stream}' from remote, using local refs: {result.stderr.strip()}")
+            return False
+        return True
+    
+    def _switch_branch(self, stream: str) -> subprocess.CompletedProcess:
+        """Switch the config checkout to a stream branch, creating it if needed"""
+        # Check for a local branch once, then dispatch a single switch
+        local_branch = subprocess.run([
+            'git', '-C', str(self.config_dir), 'show-ref', '--verify', '--quiet',
+            f'refs/heads/{stream}'
+        ])
+        
+        if local_branch.returncode == 0:
+            switch_cmd = ['git', '-C', str(self.config_dir), 'switch', stream]
+        else:
+            # Create a local tracking branch from the remote one
+            switch_cmd = [
+                'git', '-C', str(self.config_dir), 'switch', '-c', stream,
+                '--track', f'origin/{stream}'
+            ]
+            
+        return subprocess.run(switch_cmd, capture_output=True, text=True)
+    
     def switch_to_stream(self, stream: str) -> bool:
         """Switch to a specific Fedora CoreOS stream/branch"""
-        config_dir = self.work_dir / "src" / "config"
-        
-        if not config_dir.exists():
+        if not self.config_dir.exists():
             print(f"❌ Config directory not found. Please run 'cosa init' first!")
             return False
             
         print(f"🔄 Switching to stream: {stream}")
         
-        try:
-            # First, fetch latest from remote to ensure we have all branches
-            print("📡 Fetching latest branches from remote...")
-            subprocess.run([
-                'git', '-C', str(config_dir), 'fetch', 'origin'
-            ], check=True, capture_output=True)
-            
-            # Try to switch to the branch, first try as a local branch
-            result = subprocess.run([
-                'git', '-C', str(config_dir), 'checkout', stream
-            ], capture_output=True, text=True)
-            
-            # If that fails, try as a remote branch
-            if result.returncode != 0:
-                result = subprocess.run([
-                    'git', '-C', str(config_dir), 'checkout', '-b', stream, f'origin/{stream}'
-                ], capture_output=True, text=True)
-            
-            # If still fails, try switching to origin/stream directly
-            if result.returncode != 0:
-                result = subprocess.run([
-                    'git', '-C', str(config_dir), 'checkout', f'origin/{stream}'
-                ], capture_output=True, text=True)
+        # Skip the network round-trip if this stream was fetched recently
+        fetched_recently = self._fetched_recently(stream)
+        
+        if not fetched_recently:
+            self._fetch_stream(stream)
             
-            if result.returncode == 0:
-                self.current_stream = stream
-                print(f"✅ Switched to stream: {stream}")
-                
-                # Reset build state for this stream
-                if stream not in self.build_states:
-                    self.build_states[stream] = {'fetched': False, 'built': False}
-                    
-                return True
-            else:
-                print(f"❌ Failed to switch to stream '{stream}': {result.stderr}")
-                available = self.get_available_branches()
-                print(f"Available streams: {', '.join(available)}")
-                return False
+        result = self._switch_branch(stream)
+        
+        # The stream may have appeared upstream since the last fetch
+        if result.returncode != 0 and fetched_recently:
+            self._fetch_stream(stream)
+            result = self._switch_branch(stream)
+        
+        if result.returncode == 0:
+            self.current_stream = stream
+            self._invalidate_caches()
+            print(f"✅ Switched to stream: {stream}")
+            
+            # Reset build state for this stream
+            if stream not in self.build_states:
+                self.build_states[stream] = {'fetched': False, 'built': False}
                 
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Git operation failed: {e}")
+            return True
+        else:
+            print(f"❌ Failed to switch to stream '{stream}': {result.stderr}")
+            available = self.get_available_branches()
+            print(f"Available streams: {', '.join(available)}")
             return False
     
     def is_cosa_initialized(self) -> bool:
         """Check if COSA is already initialized by looking for expected structure"""
-        config_dir = self.work_dir / "src" / "config"
-        cache_dir = self.work_dir / "cache"
-        
-        # Check for key COSA directories/files
-        if (config_dir.exists() and 
-            cache_dir.exists() and
-            (config_dir / ".git").exists()):
-            return True
-        return False
+        # Check for key COSA directories/files; src/config/.git existing
+        # implies src/config does too
+        return self.config_git_dir.exists() and self.cache_dir.exists()
     
     def cosa_init(self, config_repo: str = None, force: bool = False) -> bool:
         """Initialize COSA with the configuration repository"""
@@ -231,20 +612,10 @@ class FedoraCOSABot:
             print("ℹ️  COSA already initialized!")
             
             # Get current branch
-            config_dir = self.work_dir / "src" / "config"
-            try:
-                result = subprocess.run([
-                    'git', '-C', str(config_dir), 'branch', '--show-current'
-                ], capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    current_branch = result.stdout.strip()
-                    if current_branch:
-                        self.current_stream = current_branch
-                        print(f"📋 Current stream: {current_branch}")
-                    
-            except Exception:
-                pass
+            current_branch = self._current_branch()
+            if current_branch:
+                self.current_stream = current_branch
+                print(f"📋 Current stream: {current_branch}")
             return True
             
         repo = config_repo or self.config_repo
@@ -270,30 +641,41 @@ class FedoraCOSABot:
         success = self.run_cosa_command(init_cmd)
         if success:
             self.initialized = True
+            self._invalidate_caches()
             print("✅ COSA initialized successfully!")
             
             # Check if config was cloned
-            config_dir = self.work_dir / "src" / "config"
-            if config_dir.exists():
-                print(f"📁 Configuration cloned to: {config_dir}")
+            if self.config_dir.exists():
+                print(f"📁 Configuration cloned to: {self.config_dir}")
                 
                 # Get current branch
-                try:
-                    result = subprocess.run([
-                        'git', '-C', str(config_dir), 'branch', '--show-current'
-                    ], capture_output=True, text=True)
-                    
-                    if result.returncode == 0:
-                        current_branch = result.stdout.strip()
-                        if current_branch:
-                            self.current_stream = current_branch
-                            print(f"📋 Current stream: {current_branch}")
-                        
-                except Exception:
-                    pass
+                current_branch = self._current_branch()
+                if current_branch:
+                    self.current_stream = current_branch
+                    print(f"📋 Current stream: {current_branch}")
             
         return success
     
+    def _ask(self, prompt: str) -> str:
+        """Read an answer to a sub-prompt, keeping it out of the command history"""
+        if readline is None:
+            return input(prompt)
+            
+        # readline skips blank and repeated lines, so only drop an entry
+        # that this answer actually added
+        length = readline.get_current_history_length()
+        answer = input(prompt)
+        if readline.get_current_history_length() > length:
+            readline.remove_history_item(length)
+        return answer
+    
+    def _confirm(self, prompt: str) -> bool:
+        """Ask a yes/no question, answering no in non-interactive mode"""
+        if self.non_interactive:
+            print(f"{prompt}n (non-interactive mode)")
+            return False
+        return self._ask(prompt).strip().lower() in ['y', 'yes']
+    
     def cosa_fetch(self, stream: str = None) -> bool:
         """Fetch metadata and packages for a specific stream"""
         if not self.initialized:
@@ -303,8 +685,7 @@ class FedoraCOSABot:
         # Check disk space before fetching
         if not self.check_disk_space():
             print("💡 Try running 'clean' or 'clean-all' to free up space")
-            user_input = input("Continue anyway? (y/N): ").strip().lower()
-            if user_input not in ['y', 'yes']:
+            if not self._confirm("Continue anyway? (y/N): "):
                 return False
             
         # Switch to stream if specified
@@ -333,8 +714,7 @@ class FedoraCOSABot:
         # Check disk space before building
         if not self.check_disk_space():
             print("💡 Try running 'clean' or 'clean-all' to free up space")
-            user_input = input("Continue anyway? (y/N): ").strip().lower()
-            if user_input not in ['y', 'yes']:
+            if not self._confirm("Continue anyway? (y/N): "):
                 return False
             
         # Switch to stream if specified
@@ -360,14 +740,25 @@ class FedoraCOSABot:
             print(f"✅ Build completed for stream: {current}")
             
             # Check for build output
-            builds_dir = self.work_dir / "builds"
-            if builds_dir.exists():
-                latest_link = builds_dir / "latest"
+            if self.builds_dir.exists():
+                latest_link = self.builds_dir / "latest"
                 if latest_link.exists():
                     print(f"🔗 Latest build: {latest_link}")
             
         return success
     
+    async def prepare_build(self, stream: str) -> bool:
+        """Pull the COSA container while switching an existing config checkout"""
+        steps = [asyncio.to_thread(self.pull_container)]
+        
+        # Switching only needs git, so it need not wait for the image; a
+        # fresh directory has to be initialized with the container first
+        if self.is_cosa_initialized():
+            steps.append(asyncio.to_thread(self.switch_to_stream, stream))
+            
+        # A failed switch is final; build_stream would only repeat it
+        return all(await asyncio.gather(*steps))
+    
     def build_stream(self, stream: str) -> bool:
         """Automated workflow to build a specific stream"""
         print(f"🚀 Starting automated build for stream: {stream}")
@@ -383,8 +774,8 @@ class FedoraCOSABot:
             self.initialized = True
             print("📋 Detected existing COSA initialization")
         
-        # Switch to stream
-        if not self.switch_to_stream(stream):
+        # Switch to stream (prepare_build may already have done so)
+        if stream != self.current_stream and not self.switch_to_stream(stream):
             return False
             
         # Fetch and build
@@ -487,7 +878,7 @@ class FedoraCOSABot:
         print("   4. Run multiple tests: separate with spaces (e.g., 'basic podman')")
         print("   5. Cancel: type 'cancel'")
         
-        user_input = input("\n🧪 Enter test pattern or name: ").strip()
+        user_input = self._ask("\n🧪 Enter test pattern or name: ").strip()
         
         if user_input.lower() == 'cancel':
             print("❌ Test execution cancelled")
@@ -499,33 +890,36 @@ class FedoraCOSABot:
         print("   --qemu-image=X   - Use specific image")
         print("   --timeout=Xs     - Set timeout (e.g., 300s)")
         
-        custom_args = input("🔧 Additional args (or press Enter): ").strip()
+        custom_args = self._ask("🔧 Additional args (or press Enter): ").strip()
         
         return self.kola_run_tests(user_input, custom_args)
     
     def show_test_summary(self):
         """Show testing status summary"""
-        print(f"\n🧪 Kola Testing Summary:")
+        lines = ["\n🧪 Kola Testing Summary:"]
         
         if not self.initialized:
-            print("   ❌ COSA not initialized")
+            lines.append("   ❌ COSA not initialized")
+            print("\n".join(lines))
             return
             
         tested_streams = 0
         for stream, state in self.build_states.items():
             if state.get('built', False):
-                print(f"   📦 {stream}: Build available - ready for testing")
+                lines.append(f"   📦 {stream}: Build available - ready for testing")
                 tested_streams += 1
             elif state.get('fetched', False):
-                print(f"   📋 {stream}: Fetched only - need to build first")
+                lines.append(f"   📋 {stream}: Fetched only - need to build first")
             else:
-                print(f"   ❌ {stream}: Not ready")
+                lines.append(f"   ❌ {stream}: Not ready")
                 
         if tested_streams == 0:
-            print("   💡 No builds available for testing. Build an image first!")
+            lines.append("   💡 No builds available for testing. Build an image first!")
         else:
-            print(f"   ✅ {tested_streams} stream(s) ready for testing")
-            print("   💡 Use 'kola list' to see available tests")
+            lines.append(f"   ✅ {tested_streams} stream(s) ready for testing")
+            lines.append("   💡 Use 'kola list' to see available tests")
+            
+        print("\n".join(lines))
 
     def cosa_run(self, custom_args: str = "") -> bool:
         """Run the built CoreOS image"""
@@ -545,7 +939,6 @@ class FedoraCOSABot:
     def check_disk_space(self):
         """Check available disk space"""
         try:
-            import shutil
             total, used, free = shutil.disk_usage(self.work_dir)
             
             total_gb = total / (1024**3)
@@ -576,25 +969,33 @@ class FedoraCOSABot:
     def clean_directory(self) -> bool:
         """Clean the working directory completely"""
         try:
-            existing_items = list(self.work_dir.iterdir())
+            # DirEntry caches the file type from the directory read
+            with os.scandir(self.work_dir) as entries:
+                existing_items = list(entries)
             if not existing_items:
                 print("📁 Directory is already empty")
                 return True
                 
             print(f"🧹 Cleaning working directory ({len(existing_items)} items)...")
             print("⚠️  This will remove ALL files in the working directory!")
-            user_input = input("Continue? (y/N): ").strip().lower()
-            
-            if user_input not in ['y', 'yes']:
+            if not self._confirm("Continue? (y/N): "):
                 print("❌ Directory cleaning cancelled")
                 return False
                 
+            dirs = []
             for item in existing_items:
                 print(f"   🗑️  Removing: {item.name}")
-                if item.is_dir():
-                    subprocess.run(['rm', '-rf', str(item)], check=True)
+                if item.is_dir(follow_symlinks=False):
+                    dirs.append(item.path)
                 else:
-                    item.unlink()
+                    os.unlink(item.path)
+
+            # Directory trees are removed concurrently since the work is
+            # I/O-bound; result() re-raises the first failure, if any
+            if dirs:
+                with ThreadPoolExecutor(max_workers=min(8, len(dirs))) as executor:
+                    for future in [executor.submit(shutil.rmtree, d) for d in dirs]:
+                        future.result()
                     
             print("✅ Directory cleaned successfully")
             
@@ -602,6 +1003,7 @@ class FedoraCOSABot:
             self.initialized = False
             self.current_stream = None
             self.build_states = {}
+            self._invalidate_caches()
             
             return True
             
@@ -611,13 +1013,13 @@ class FedoraCOSABot:
 
     def clean_builds(self, keep_latest: bool = True) -> bool:
         """Clean old build artifacts to free up space"""
-        builds_dir = self.work_dir / "builds"
-        if not builds_dir.exists():
+        if not self.builds_dir.exists():
             print("📁 No builds directory found - nothing to clean")
             return True
             
         try:
-            build_dirs = [d for d in builds_dir.iterdir() if d.is_dir() and d.name != "latest"]
+            with os.scandir(self.builds_dir) as entries:
+                build_dirs = [e for e in entries if e.is_dir() and e.name != "latest"]
             
             if not build_dirs:
                 print("🧹 No old builds to clean")
@@ -630,7 +1032,10 @@ class FedoraCOSABot:
                     continue
                     
                 print(f"   🗑️  Removing: {build_dir.name}")
-                subprocess.run(['rm', '-rf', str(build_dir)], check=True)
+                if build_dir.is_dir(follow_symlinks=False):
+                    shutil.rmtree(build_dir.path)
+                else:
+                    os.unlink(build_dir.path)
                 
             print("✅ Build cleanup completed")
             return True
@@ -644,15 +1049,16 @@ class FedoraCOSABot:
         try:
             print("🧹 Cleaning unused containers and images...")
             
-            # Remove stopped containers
-            result = subprocess.run(['podman', 'container', 'prune', '-f'], 
-                                  capture_output=True, text=True)
+            # Remove stopped containers first, so the image prune can also
+            # free the images they were holding
+            result = subprocess.run(['podman', 'container', 'prune', '-f'],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             if result.returncode == 0:
                 print("   ✅ Cleaned stopped containers")
             
             # Remove unused images (but keep COSA image)
-            result = subprocess.run(['podman', 'image', 'prune', '-f'], 
-                                  capture_output=True, text=True)
+            result = subprocess.run(['podman', 'image', 'prune', '-f'],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             if result.returncode == 0:
                 print("   ✅ Cleaned unused images")
                 
@@ -664,50 +1070,54 @@ class FedoraCOSABot:
 
     def show_status(self):
         """Show current build status"""
-        print(f"\n📊 Fedora CoreOS Build Status:")
-        print(f"   Working Directory: {self.work_dir}")
-        print(f"   ✅ Initialized: {'Yes' if self.initialized else 'No'}")
-        print(f"   📋 Current Stream: {self.current_stream or 'None'}")
+        lines = [
+            "\n📊 Fedora CoreOS Build Status:",
+            f"   Working Directory: {self.work_dir}",
+            f"   ✅ Initialized: {'Yes' if self.initialized else 'No'}",
+            f"   📋 Current Stream: {self.current_stream or 'None'}",
+        ]
         
         if self.build_states:
-            print(f"   🔨 Build States:")
+            lines.append("   🔨 Build States:")
             for stream, state in self.build_states.items():
                 fetched = "✅" if state.get('fetched', False) else "❌"
                 built = "✅" if state.get('built', False) else "❌"
-                print(f"      {stream}: Fetched {fetched} | Built {built}")
+                lines.append(f"      {stream}: Fetched {fetched} | Built {built}")
         
         # Check for actual artifacts
-        config_dir = self.work_dir / "src" / "config"
-        if config_dir.exists():
-            print(f"   📁 Config repo: Present")
-            available = self.get_available_branches()
-            print(f"   🌿 Available streams: {', '.join(available[:5])}{'...' if len(available) > 5 else ''}")
-            
-        builds_dir = self.work_dir / "builds"
-        if builds_dir.exists():
-            build_dirs = [d for d in builds_dir.iterdir() if d.is_dir()]
-            print(f"   📦 Total builds: {len(build_dirs)}")
-            if (builds_dir / "latest").exists():
-                print(f"   🔗 Latest build: Available")
+        if self.config_dir.exists():
+            lines.append("   📁 Config repo: Present")
+            available = self.get_available_branches(allow_network=False)
+            lines.append(f"   🌿 Available streams (last fetched): {', '.join(available[:5])}{'...' if len(available) > 5 else ''}")
+            
+        if self.builds_dir.exists():
+            with os.scandir(self.builds_dir) as entries:
+                build_count = sum(1 for e in entries if e.is_dir())
+            lines.append(f"   📦 Total builds: {build_count}")
+            if (self.builds_dir / "latest").exists():
+                lines.append("   🔗 Latest build: Available")
                 
+        print("\n".join(lines))
+        
         # Show disk space
         self.check_disk_space()
     
     def refresh_branches(self) -> bool:
         """Fetch all remote branches and show available streams"""
-        config_dir = self.work_dir / "src" / "config"
-        
-        if not config_dir.exists():
+        if not self.config_dir.exists():
             print("❌ Config directory not found. Please run 'init' first!")
             return False
             
         try:
             print("📡 Fetching all remote branches...")
             subprocess.run([
-                'git', '-C', str(config_dir), 'fetch', 'origin'
+                'git', '-C', str(self.config_dir), 'fetch', '--filter=blob:none', 'origin'
             ], check=True)
             
             print("✅ Remote branches updated!")
+            self._invalidate_caches()
+            self._branches_cache = self._remote_branches()
+            self._branches_cache_ts = time.time()
             self.list_streams()
             return True
             
@@ -722,8 +1132,9 @@ class FedoraCOSABot:
             print("💡 Run 'init' first to get the actual list from the repository")
             return
             
-        streams = self.get_available_branches()
-        print(f"\n🌿 Available Fedora CoreOS streams:")
+        # Use what is known locally; 'refresh' fetches from the remote
+        streams = self.get_available_branches(allow_network=False)
+        lines = ["\n🌿 Available Fedora CoreOS streams:"]
         
         for stream in streams:
             status = ""
@@ -735,149 +1146,187 @@ class FedoraCOSABot:
                     status = "📦 Fetched"
             
             current_marker = "👉 " if stream == self.current_stream else "   "
-            print(f"{current_marker}{stream} {status}")
+            lines.append(f"{current_marker}{stream} {status}")
             
         if not streams or len(streams) <= 1:
-            print("\n💡 If you only see one stream, try 'refresh' to fetch all remote branches")
+            lines.append("\n💡 If you only see one stream, try 'refresh' to fetch all remote branches")
+            
+        print("\n".join(lines))
     
     def show_help(self):
         """Show available commands"""
-        print("""
-🤖 Fedora CoreOS Bot Commands:
-
-Quick Build Commands:
-  build <stream>     - Automatically build a specific stream (e.g., 'build rawhide')
-  build stable       - Build the stable release
-  build testing      - Build the testing release  
-  build testing-devel- Build the testing development version
-  build next         - Build the next release
-  build rawhide      - Build the latest development version
-  
-Testing Commands:
-  kola list          - List all available kola tests
-  kola run [pattern] - Run kola tests (all tests or matching pattern)
-  kola interactive   - Interactive test selection and execution
-  test [pattern]     - Shorthand for kola run
-  run [test] test    - Natural language test runner (e.g., "run basic test")
-  run [test]         - Run specific test (e.g., "run basic", "run podman")
-  test-summary       - Show testing status for all streams
-  
-Manual Build Commands:
-  init [repo]        - Initialize COSA (default: fedora-coreos-config)
-  force-init [repo]  - Force initialize COSA (override non-empty directory)
-  fetch [stream]     - Fetch packages for current or specified stream
-  build [stream]     - Build image for current or specified stream
-  run [args]         - Run the built CoreOS VM
-  
-Stream Management:
-  streams            - List available streams/branches
-  refresh            - Fetch all remote branches and update stream list
-  switch <stream>    - Switch to a different stream
-  current            - Show current stream
-  
-Utility Commands:
-  status             - Show detailed build status and disk space
-  pull               - Pull latest COSA container
-  shell              - Open shell in COSA container
-  disk               - Check disk space usage
-  clean              - Clean old builds to free space
-  clean-all          - Clean builds and unused containers
-  clean-dir          - Clean entire working directory
-  help               - Show this help message
-  quit/exit          - Exit the bot
-
-🚀 Quick Start Examples:
-  "build rawhide"      - Build the latest Fedora CoreOS development version
-  "build stable"       - Build the stable release
-  "build testing-devel"- Build the testing development version
-  "kola list"          - See all available tests after building
-  "run basic test"     - Run basic kola tests (natural language)
-  "run basic"          - Run basic tests (shorthand)
-  "run podman test"    - Run podman-related tests
-  "kola interactive"   - Interactively select and run tests
-  "run"                - Start the CoreOS VM (no args = VM, with test name = kola)
-  "switch next"        - Switch to next stream, then "fetch" and "build"
-
-💡 Tips:
-  - Different streams correspond to different git branches
-  - The bot tracks build state per stream automatically  
-  - CoreOS builds require 10-20 GB of free disk space
-  - After building, use natural language: 'run basic test', 'run podman test'
-  - Use 'run' alone to start VM, 'run [test]' to run kola tests
-  - Use 'kola list' to see all available tests
-  - Use 'disk' to check space and 'clean' to free up space
-  - If init fails with "directory not empty", use 'force-init' or 'clean-dir'
-  - If streams are missing, use 'refresh' to fetch all remote branches
-  - Use 'status' to see what's been built for each stream
-  - All data persists in the working directory
-        """)
+        print(_HELP_TEXT)
     
     def parse_command(self, user_input: str) -> tuple:
         """Parse user input into command and arguments"""
-        parts = user_input.strip().split()
+        # split() already drops surrounding whitespace
+        parts = user_input.split()
         if not parts:
             return None, []
             
         command = parts[0].lower()
-        args = parts[1:] if len(parts) > 1 else []
+        args = parts[1:]
+        
+        # Most commands are a single word and need no further analysis
+        if not args:
+            return _BARE_COMMANDS.get(command) or _COMMAND_ALIASES.get(command, command), args
         
         # Handle natural language patterns
         if command == "build" and len(args) == 1:
             return "build_stream", args
-        elif command in ["switch", "checkout"] and len(args) == 1:
-            return "switch", args
-        elif command in ["streams", "branches", "list"]:
-            return "list_streams", []
-        elif command in ["refresh", "update", "fetch-branches"]:
-            return "refresh", []
-        elif command == "current":
-            return "current_stream", []
-        elif command == "force-init":
-            return "force-init", args
-        elif command in ["clean-dir", "clean-directory"]:
-            return "clean-dir", []
         elif command == "kola":
-            if not args:
-                return "kola_help", []
-            elif args[0].lower() == "list":
-                return "kola_list", []
-            elif args[0].lower() == "run":
+            subcommand = args[0].lower()
+            if subcommand == "run":
                 return "kola_run", args[1:]  # Pass remaining args as test pattern
-            elif args[0].lower() == "interactive":
-                return "kola_interactive", []
+            elif subcommand in _KOLA_SUBCOMMANDS:
+                return _KOLA_SUBCOMMANDS[subcommand], []
             else:
                 return "kola_run", args  # Treat first arg as test pattern
-        elif command == "test":
-            return "kola_run", args  # Shorthand for kola run
-        elif command == "test-summary":
-            return "test_summary", []
         elif command == "run":
             # Smart parsing for "run" command
-            if not args:
-                # "run" alone -> start VM
-                return "run_vm", []
-            elif len(args) == 1:
+            if len(args) == 1:
                 # Check if it looks like a test name or VM args
-                test_indicators = ["basic", "podman", "network", "internet", "coreos", "ostree", "rpmostree", "systemd"]
-                if any(indicator in args[0].lower() for indicator in test_indicators):
+                if _TEST_INDICATOR_RE.search(args[0]):
                     # "run basic" -> run kola test
                     return "kola_run", args
                 else:
                     # "run --some-vm-arg" -> start VM with args
                     return "run_vm", args
-            elif len(args) >= 2 and args[-1].lower() in ["test", "tests"]:
+            elif args[-1].lower() in _TEST_SUFFIXES:
                 # "run basic test" or "run basic tests" -> run kola test
                 test_pattern = " ".join(args[:-1])  # Remove "test/tests" from the end
                 return "kola_run", [test_pattern]
-            elif any(word in " ".join(args).lower() for word in ["test", "kola"]):
+            elif _TEST_KEYWORD_RE.search(" ".join(args)):
                 # Contains "test" or "kola" -> run kola test
                 return "kola_run", args
             else:
                 # Default to VM run with args
                 return "run_vm", args
             
-        return command, args
+        # Plain aliases map straight to their canonical command name
+        return _COMMAND_ALIASES.get(command, command), args
 
+    def _setup_readline(self):
+        """Enable persistent history and command tab-completion at the prompt"""
+        if readline is None:
+            return
+            
+        try:
+            readline.read_history_file(self.HISTORY_FILE)
+        except OSError:
+            pass  # first run, or history not readable
+        readline.set_history_length(self.HISTORY_LENGTH)
+        
+        def save_history():
+            try:
+                readline.write_history_file(self.HISTORY_FILE)
+            except OSError:
+                pass
+        atexit.register(save_history)
+        
+        words = sorted(word for word in {*self._COMMANDS, *_COMMAND_ALIASES, *_BARE_COMMANDS, 'quit', 'exit'}
+                       if '_' not in word)  # internal names aren't worth offering
+        matches = []
+        
+        def complete(text, state):
+            if state == 0:
+                # Prefix matches form a contiguous range of the sorted list
+                lo = bisect.bisect_left(words, text)
+                hi = bisect.bisect_left(words, text + '\uffff')
+                matches[:] = words[lo:hi] if readline.get_begidx() == 0 else []
+            return matches[state] if state < len(matches) else None
+            
+        readline.set_completer(complete)
+        readline.set_completer_delims(' \t\n')
+        readline.parse_and_bind('tab: complete')
+    
+    def _cmd_build_stream(self, args: List[str]):
+        if args:
+            self.build_stream(args[0])
+        else:
+            print("❌ Please specify a stream to build (e.g., 'build rawhide')")
+    
+    def _cmd_switch(self, args: List[str]):
+        if args:
+            self.switch_to_stream(args[0])
+        else:
+            print("❌ Please specify a stream to switch to")
+    
+    def _cmd_current_stream(self, args: List[str]):
+        if self.current_stream:
+            print(f"📋 Current stream: {self.current_stream}")
+        else:
+            print("📋 No stream selected (run 'init' first)")
+    
+    def _cmd_shell(self, args: List[str]):
+        print("🐚 Opening COSA shell...")
+        self.run_cosa_command("shell")
+    
+    def _cmd_clean_all(self, args: List[str]):
+        self.clean_builds()
+        self.clean_containers()
+    
+    def _cmd_kola_help(self, args: List[str]):
+        print("🧪 Kola Testing Commands:")
+        print("   kola list        - List all available tests")
+        print("   kola run [pattern] - Run tests (all or matching pattern)")
+        print("   kola interactive - Interactive test selection")
+        print("   test [pattern]   - Shorthand for kola run")
+        print("   test-summary     - Show testing status")
+    
+    def _cmd_kola_run(self, args: List[str]):
+        if args:
+            pattern = " ".join(args)
+            self.kola_run_tests(pattern)
+        else:
+            # Ask user what they want to test
+            print("🧪 Kola Test Options:")
+            print("   1. Run all tests (press Enter)")
+            print("   2. List tests first (type 'list')")
+            print("   3. Interactive selection (type 'interactive')")
+            choice = self._ask("Choose option: ").strip().lower()
+            
+            if choice == 'list':
+                self.kola_list_tests()
+            elif choice == 'interactive':
+                self.kola_run_specific_tests()
+            else:
+                self.kola_run_tests()
+    
+    def _cmd_unknown(self, command: str):
+        print(f"❌ Unknown command: {command}")
+        print("   Try 'build rawhide', 'build stable', or 'build testing-devel'")
+        print("   After building, try 'kola list', 'run basic test', or 'run podman test'")
+        print("   Type 'help' for available commands")
+    
+    # Canonical command name -> handler taking (bot, args). parse_command
+    # resolves aliases and natural-language forms to these names.
+    _COMMANDS = {
+        'help': lambda self, args: self.show_help(),
+        'status': lambda self, args: self.show_status(),
+        'pull': lambda self, args: self.pull_container(),
+        'init': lambda self, args: self.cosa_init(args[0] if args else None),
+        'force-init': lambda self, args: self.cosa_init(args[0] if args else None, force=True),
+        'fetch': lambda self, args: self.cosa_fetch(args[0] if args else None),
+        'build': lambda self, args: self.cosa_build(args[0] if args else None),
+        'build_stream': _cmd_build_stream,
+        'switch': _cmd_switch,
+        'current_stream': _cmd_current_stream,
+        'list_streams': lambda self, args: self.list_streams(),
+        'refresh': lambda self, args: self.refresh_branches(),
+        'run_vm': lambda self, args: self.cosa_run(" ".join(args)),
+        'shell': _cmd_shell,
+        'disk': lambda self, args: self.check_disk_space(),
+        'clean': lambda self, args: self.clean_builds(),
+        'clean-all': _cmd_clean_all,
+        'clean-dir': lambda self, args: self.clean_directory(),
+        'kola_help': _cmd_kola_help,
+        'kola_list': lambda self, args: self.kola_list_tests(),
+        'kola_run': _cmd_kola_run,
+        'kola_interactive': lambda self, args: self.kola_run_specific_tests(),
+        'test_summary': lambda self, args: self.show_test_summary(),
+    }
+    
     def interactive_mode(self):
         """Run the chatbot in interactive mode"""
         print("🤖 Welcome to Fedora CoreOS Bot!")
@@ -890,9 +1339,11 @@ Utility Commands:
             print("❌ Prerequisites not met. Please fix the issues above.")
             return
             
+        self._setup_readline()
+            
         while True:
             try:
-                user_input = input(f"\n🤖 fcos-bot ({self.current_stream or 'none'})> ").strip()
+                user_input = input(self._prompt).strip()
                 
                 if not user_input:
                     continue
@@ -903,117 +1354,11 @@ Utility Commands:
                     print("👋 Goodbye!")
                     break
                     
-                elif command == 'help':
-                    self.show_help()
-                    
-                elif command == 'status':
-                    self.show_status()
-                    
-                elif command == 'pull':
-                    self.pull_container()
-                    
-                elif command == 'init':
-                    repo = args[0] if args else None
-                    self.cosa_init(repo)
-                    
-                elif command == 'force-init':
-                    repo = args[0] if args else None
-                    self.cosa_init(repo, force=True)
-                    
-                elif command == 'fetch':
-                    stream = args[0] if args else None
-                    self.cosa_fetch(stream)
-                    
-                elif command == 'build':
-                    stream = args[0] if args else None
-                    self.cosa_build(stream)
-                    
-                elif command == 'build_stream':
-                    if args:
-                        self.build_stream(args[0])
-                    else:
-                        print("❌ Please specify a stream to build (e.g., 'build rawhide')")
-                        
-                elif command == 'switch':
-                    if args:
-                        self.switch_to_stream(args[0])
-                    else:
-                        print("❌ Please specify a stream to switch to")
-                        
-                elif command == 'current_stream':
-                    if self.current_stream:
-                        print(f"📋 Current stream: {self.current_stream}")
-                    else:
-                        print("📋 No stream selected (run 'init' first)")
-                        
-                elif command == 'list_streams':
-                    self.list_streams()
-                    
-                elif command == 'refresh':
-                    self.refresh_branches()
-                    
-                elif command == 'run_vm':
-                    custom_args = " ".join(args) if args else ""
-                    self.cosa_run(custom_args)
-                    
-                elif command == 'shell':
-                    print("🐚 Opening COSA shell...")
-                    self.run_cosa_command("shell")
-                    
-                elif command == 'disk':
-                    self.check_disk_space()
-                    
-                elif command == 'clean':
-                    self.clean_builds()
-                    
-                elif command == 'clean-all':
-                    self.clean_builds()
-                    self.clean_containers()
-                    
-                elif command == 'clean-dir':
-                    self.clean_directory()
-                    
-                elif command == 'kola_help':
-                    print("🧪 Kola Testing Commands:")
-                    print("   kola list        - List all available tests")
-                    print("   kola run [pattern] - Run tests (all or matching pattern)")
-                    print("   kola interactive - Interactive test selection")
-                    print("   test [pattern]   - Shorthand for kola run")
-                    print("   test-summary     - Show testing status")
-                    
-                elif command == 'kola_list':
-                    self.kola_list_tests()
-                    
-                elif command == 'kola_run':
-                    if args:
-                        pattern = " ".join(args)
-                        self.kola_run_tests(pattern)
-                    else:
-                        # Ask user what they want to test
-                        print("🧪 Kola Test Options:")
-                        print("   1. Run all tests (press Enter)")
-                        print("   2. List tests first (type 'list')")
-                        print("   3. Interactive selection (type 'interactive')")
-                        choice = input("Choose option: ").strip().lower()
-                        
-                        if choice == 'list':
-                            self.kola_list_tests()
-                        elif choice == 'interactive':
-                            self.kola_run_specific_tests()
-                        else:
-                            self.kola_run_tests()
-                            
-                elif command == 'kola_interactive':
-                    self.kola_run_specific_tests()
-                    
-                elif command == 'test_summary':
-                    self.show_test_summary()
-                    
+                handler = self._COMMANDS.get(command)
+                if handler:
+                    handler(self, args)
                 else:
-                    print(f"❌ Unknown command: {command}")
-                    print("   Try 'build rawhide', 'build stable', or 'build testing-devel'")
-                    print("   After building, try 'kola list', 'run basic test', or 'run podman test'")
-                    print("   Type 'help' for available commands")
+                    self._cmd_unknown(command)
                     
             except KeyboardInterrupt:
                 print("\n👋 Goodbye!")
@@ -1033,13 +1378,23 @@ def main():
                        help='Automatically build specified stream (e.g., rawhide, stable, testing-devel)')
     parser.add_argument('--config-repo', 
                        help='Custom config repository URL')
+    parser.add_argument('--non-interactive', action='store_true',
+                       help='Never prompt for confirmation; answer no instead '
+                            '(also enabled by FEDORABOT_NONINTERACTIVE=1)')
     
     args = parser.parse_args()
     
+    # Exit normally on SIGTERM/SIGHUP (e.g. a closed terminal) so that the
+    # atexit handlers run and remove the persistent COSA container
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, lambda signum, frame: sys.exit(128 + signum))
+    
     # Create bot instance
     bot = FedoraCOSABot(args.work_dir)
     if args.config_repo:
         bot.config_repo = args.config_repo
+    if args.non_interactive:
+        bot.non_interactive = True
     
     if args.build:
         print(f"🤖 Running automated build for stream: {args.build}")
@@ -1047,8 +1402,9 @@ def main():
         if not bot.check_prerequisites():
             sys.exit(1)
             
-        # Pull container
-        if not bot.pull_container():
+        # Pull container, overlapping it with the stream switch if possible;
+        # stop if either fails
+        if not asyncio.run(bot.prepare_build(args.build)):
             sys.exit(1)
             
         # Build specified stream